@@ -1,13 +1,16 @@
 """
 Configuration loader for the application.
 Reads 'config.ini' and provides a global 'config' object.
+The file is parsed lazily, on first attribute access, once per process.
 """
 
 import os
-import configparser
+from functools import lru_cache
 
 from pydantic_settings import BaseSettings
 
+from . import fast_ini
+
 # TODO: Merge pydantic settings 
 # New settings using pydantic
 class Settings(BaseSettings):
@@ -26,33 +29,36 @@ class AppConfig:
     """Loads and holds all application configuration from config.ini."""
     
     def __init__(self, config_path='config.ini'):
-        parser = configparser.ConfigParser()
-        
         self.SCRIPT_DIR = os.path.abspath(os.path.dirname(__file__))
         # Look for config.ini in the *root* directory (one level up)
         config_file_path = os.path.join(self.SCRIPT_DIR, '..', config_path)
 
-        if not os.path.exists(config_file_path):
+        try:
+            self._ini = fast_ini.parse(config_file_path)
+        except FileNotFoundError:
             print(f"INFO: Config file not found. A default one will be assumed by the application.")
+            self._ini = {}
 
-        parser.read(config_file_path)
-
-        self.APP_VERSION = parser.get('server', 'app_version', fallback='v17.0 (project-caching)')
+        self.APP_VERSION = self._get('server', 'app_version', fallback='v17.0 (project-caching)')
         
-        self.CELERY_BROKER_URL = parser.get('celery', 'broker_url', fallback="redis://localhost:6379/0")
-        self.CELERY_RESULT_BACKEND = parser.get('celery', 'result_backend', fallback="redis://localhost:6379/0")
+        self.CELERY_BROKER_URL = self._get('celery', 'broker_url', fallback="redis://localhost:6379/0")
+        self.CELERY_RESULT_BACKEND = self._get('celery', 'result_backend', fallback="redis://localhost:6379/0")
 
-        self.HOST = parser.get('server', 'host', fallback='0.0.0.0')
-        self.PORT = parser.getint('server', 'port', fallback=5001)
+        self.HOST = self._get('server', 'host', fallback='0.0.0.0')
+        self.PORT = self._getint('server', 'port', fallback=5001)
 
-        self.DEBUG = parser.getboolean('server', 'debug', fallback=False)
-        self.LOG_LEVEL = parser.get('server', 'log_level', fallback='INFO').upper()
+        self.DEBUG = self._getbool('server', 'debug', fallback=False)
+        # Hand file downloads to the fronting proxy (nginx/apache) via X-Sendfile
+        self.USE_X_SENDFILE = self._getbool('server', 'use_x_sendfile', fallback=False)
+        self.LOG_LEVEL = self._get('server', 'log_level', fallback='INFO').upper()
 
-        self.MAX_CONCURRENT_JOBS = parser.getint('jobs', 'max_concurrent_jobs', fallback=2)
-        secrets_str = parser.get('jobs', 'secret_filenames', fallback='secrets.yaml, secrets.yml')
+        self.MAX_CONCURRENT_JOBS = self._getint('jobs', 'max_concurrent_jobs', fallback=2)
+        # Run jobs on an in-process pool instead of Celery (single-host setups only)
+        self.USE_LOCAL_EXECUTOR = self._getbool('jobs', 'use_local_executor', fallback=False)
+        secrets_str = self._get('jobs', 'secret_filenames', fallback='secrets.yaml, secrets.yml')
         self.SECRET_FILENAMES = [s.strip() for s in secrets_str.split(',') if s.strip()]
 
-        base_dir_config = parser.get('paths', 'base_dir', fallback='esphome_jobs')
+        base_dir_config = self._get('paths', 'base_dir', fallback='esphome_jobs')
         # Use script's PARENT dir (root) as base for relative paths
         root_dir = os.path.join(self.SCRIPT_DIR, '..')
         if os.path.isabs(base_dir_config):
@@ -60,9 +66,9 @@ class AppConfig:
         else:
             self.JOBS_DIR = os.path.join(root_dir, base_dir_config)
         
-        self.LOGS_DIR = os.path.join(self.JOBS_DIR, parser.get('paths', 'logs_dir', fallback='logs'))
-        self.PROJECTS_DIR = os.path.join(self.JOBS_DIR, parser.get('paths', 'projects_dir', fallback='projects'))
-        self.BINARIES_DIR = os.path.join(self.JOBS_DIR, parser.get('paths', 'binaries_dir', fallback='binaries'))
+        self.LOGS_DIR = os.path.join(self.JOBS_DIR, self._get('paths', 'logs_dir', fallback='logs'))
+        self.PROJECTS_DIR = os.path.join(self.JOBS_DIR, self._get('paths', 'projects_dir', fallback='projects'))
+        self.BINARIES_DIR = os.path.join(self.JOBS_DIR, self._get('paths', 'binaries_dir', fallback='binaries'))
         
         # Use environment variable if set (e.g., from Docker), otherwise use config
         env_pio_cache = os.environ.get('PLATFORMIO_CORE_DIR')
@@ -70,7 +76,30 @@ class AppConfig:
             self.PLATFORMIO_CACHE_DIR = env_pio_cache
             print(f"INFO: Using PLATFORMIO_CORE_DIR from environment: {env_pio_cache}")
         else:
-            self.PLATFORMIO_CACHE_DIR = os.path.join(self.JOBS_DIR, parser.get('paths', 'platformio_cache_dir', fallback='platformio_cache'))
+            self.PLATFORMIO_CACHE_DIR = os.path.join(self.JOBS_DIR, self._get('paths', 'platformio_cache_dir', fallback='platformio_cache'))
             print(f"INFO: Using PLATFORMIO_CORE_DIR from config: {self.PLATFORMIO_CACHE_DIR}")
 
-config = AppConfig('config.ini')
+    def _get(self, section, key, fallback=None):
+        return self._ini.get(section, {}).get(key, fallback)
+
+    def _getint(self, section, key, fallback=None):
+        value = self._get(section, key)
+        return fallback if value is None else int(value)
+
+    def _getbool(self, section, key, fallback=None):
+        value = self._get(section, key)
+        return fallback if value is None else fast_ini.to_bool(value)
+
+@lru_cache(maxsize=1)
+def get_config():
+    """Returns the process-wide AppConfig, parsing config.ini on first call."""
+    return AppConfig('config.ini')
+
+
+class _LazyConfig:
+    """Proxy that defers building AppConfig until an attribute is read."""
+
+    def __getattr__(self, name):
+        return getattr(get_config(), name)
+
+config = _LazyConfig()
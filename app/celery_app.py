@@ -4,6 +4,9 @@ Celery configuration and task definitions.
 
 import os
 from celery import Celery
+from celery.signals import celeryd_init
+
+from .app_config import config
 
 def make_celery():
     """
@@ -15,7 +18,9 @@ def make_celery():
     celery = Celery(
         'esphome_relay',
         broker=broker_url,
-        backend=result_backend
+        backend=result_backend,
+        # Task modules, imported once by the worker's main process before it forks
+        include=['app.jobs'],
     )
     
     celery.conf.update(
@@ -26,8 +31,22 @@ def make_celery():
         enable_utc=True,
         task_track_started=True,
         task_send_sent_event=True,
+        # Each worker takes one long build at a time
+        worker_prefetch_multiplier=1,
+        # Reuse broker connections across publishes instead of reconnecting per task
+        broker_pool_limit=10,
+        broker_connection_retry_on_startup=True,
+        # Publisher confirms exist only on AMQP brokers such as RabbitMQ; with a
+        # Redis broker (the app_config default) this option has no effect
+        broker_transport_options={'confirm_publish': True},
+        result_backend_transport_options={'retry_on_timeout': True},
     )
     
     return celery
 
 celery = make_celery()
+
+@celeryd_init.connect
+def _configure_worker(sender=None, conf=None, **kwargs):
+    """Sizes the worker pool from config; only worker processes read it, and -c still wins."""
+    conf.worker_concurrency = config.MAX_CONCURRENT_JOBS
@@ -0,0 +1,42 @@
+"""
+Minimal INI reader used by AppConfig.
+Parses flat 'key = value' sections into a plain dict of dicts.
+"""
+
+import re
+
+SECTION_RE = re.compile(r'^\s*\[([^\]]+)\]\s*$')
+KV_RE = re.compile(r'^\s*([^=;#\s][^=]*?)\s*=\s*(.*?)\s*$')
+
+_TRUE_VALUES = ('1', 'yes', 'true', 'on')
+
+
+def parse(path):
+    """
+    Reads an INI file into {section: {key: value}}.
+    Keys are lower-cased like configparser. Raises FileNotFoundError if missing.
+    """
+    with open(path, 'r') as f:
+        lines = f.read().splitlines()
+
+    sections = {}
+    current = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped[0] in '#;':
+            continue
+        section_match = SECTION_RE.match(line)
+        if section_match:
+            current = sections.setdefault(section_match.group(1).strip(), {})
+            continue
+        if current is None:
+            continue
+        kv_match = KV_RE.match(line)
+        if kv_match:
+            current[kv_match.group(1).lower()] = kv_match.group(2)
+    return sections
+
+
+def to_bool(value):
+    """Interprets a config string as a boolean."""
+    return value.strip().lower() in _TRUE_VALUES
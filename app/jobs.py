@@ -1,24 +1,36 @@
 """
 Core job management logic.
 - Celery task for ESPHome compilation
+- Optional in-process executor for single-host setups
 - Log broadcasting
 - Directory setup
 """
 
 import os
+import sys
 import logging
+import select
 import subprocess
 import datetime
 import shutil
-import queue
-import uuid
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from celery.signals import worker_init
 from .celery_app import celery
 from .app_config import config
 from .jobs_state import (
-    JOBS_DB, JOBS_DB_LOCK, JOB_LOG_BROADCASTER, 
-    JOB_LOG_BROADCASTER_LOCK
+    JOBS_DB, get_log_channel, retire_log_channel
 )
-from .services import LogParser, _find_firmware_bin
+from .services import LogParser, _find_firmware_bin, _new_step_id
+
+# Job log files are flushed every N lines or T seconds, whichever comes first
+LOG_BUFFER_SIZE = 65536
+LOG_FLUSH_LINES = 64
+LOG_FLUSH_INTERVAL = 0.5
+# Subprocess output is read from the pipe in chunks of up to this many bytes
+PIPE_READ_SIZE = 65536
 
 def setup_directories():
     """Creates all the necessary persistent directories from config."""
@@ -30,23 +42,26 @@ def setup_directories():
         config.PLATFORMIO_CACHE_DIR
     ]
     for path in paths_to_create:
-        if not os.path.exists(path):
-            try:
-                os.makedirs(path)
-                logging.info(f"Created directory: {path}")
-            except OSError as e:
-                logging.error(f"FATAL: Could not create directory {path}: {e}")
-                exit(1)
+        try:
+            os.makedirs(path, exist_ok=True)
+            logging.info("Ensured directory: %s", path)
+        except OSError as e:
+            logging.error("FATAL: Could not create directory %s: %s", path, e)
+            sys.exit(1)
+
+@worker_init.connect
+def _prepare_worker(**kwargs):
+    """Creates the job directories once in the worker's main process, before the pool forks."""
+    setup_directories()
+
+@lru_cache(maxsize=1)
+def _base_env():
+    """Environment shared by every job subprocess, built once per process."""
+    return {**os.environ, 'PLATFORMIO_CORE_DIR': config.PLATFORMIO_CACHE_DIR}
 
 def _broadcast_log(job_id, payload):
-    """Puts a log message (as a dict) into all subscriber queues for a job_id."""
-    with JOB_LOG_BROADCASTER_LOCK:
-        if job_id in JOB_LOG_BROADCASTER:
-            for q in list(JOB_LOG_BROADCASTER[job_id]):
-                try:
-                    q.put_nowait(payload)
-                except queue.Full:
-                    pass 
+    """Publishes a log message (as a dict) to everyone streaming this job_id."""
+    get_log_channel(job_id).publish(payload)
 
 @celery.task(name='app.jobs.run_esphome_task')
 def run_esphome_task(job_id, project_dir, yaml_filename, device_name, log_path, job_type, target_device, api_password):
@@ -56,13 +71,11 @@ def run_esphome_task(job_id, project_dir, yaml_filename, device_name, log_path,
     """
     
     start_time = datetime.datetime.now()
-    with JOBS_DB_LOCK:
-        JOBS_DB[job_id]["status"] = "running"
-        JOBS_DB[job_id]["start_time"] = start_time.isoformat()
+    JOBS_DB.update(job_id, {"status": "running", "start_time": start_time.isoformat()})
 
     # --- Build the command based on job type ---
     if job_type == "upload" and target_device:
-        logging.info(f"Job {job_id}: Starting TRUE UPLOAD task for '{device_name}'. Target: {target_device}")
+        logging.info("Job %s: Starting TRUE UPLOAD task for '%s'. Target: %s", job_id, device_name, target_device)
         local_command = [
             "platformio", "run",
             "--target", "upload",
@@ -72,30 +85,31 @@ def run_esphome_task(job_id, project_dir, yaml_filename, device_name, log_path,
         ]
     else:
         job_type = "compile"
-        logging.info(f"Job {job_id}: Starting COMPILE task for '{device_name}'.")
+        logging.info("Job %s: Starting COMPILE task for '%s'.", job_id, device_name)
         
         # Use wrapper script that injects ccache configuration
         local_command = ["esphome-compile-with-ccache.sh", "compile", yaml_filename]
     
     parser = LogParser()
     
-    env = os.environ.copy()
-    env['PLATFORMIO_CORE_DIR'] = config.PLATFORMIO_CACHE_DIR
+    env = _base_env()
     if api_password:
-        env['ESPHOME_API_PASSWORD'] = api_password
+        env = {**env, 'ESPHOME_API_PASSWORD': api_password}
     
-    logging.info(f"Job {job_id}: Setting PLATFORMIO_CORE_DIR to {config.PLATFORMIO_CACHE_DIR}")
+    logging.debug("Job %s: Setting PLATFORMIO_CORE_DIR to %s", job_id, config.PLATFORMIO_CACHE_DIR)
     
     try:
-        with open(log_path, 'w') as log_file:
-            log_file.write(f"--- RUNNING SCRIPT VERSION {config.APP_VERSION} ---\n")
-            log_file.write(f"--- Starting {job_type.upper()} job {job_id} for project '{device_name}' ---\n")
-            log_command = local_command[:]
-            if api_password: log_file.write(f"Env: ESPHOME_API_PASSWORD set to '********'\n")
-            log_file.write(f"Command: {' '.join(log_command)}\n")
-            log_file.write(f"Project Dir: {project_dir}\n")
-            log_file.write(f"PlatformIO Cache: {config.PLATFORMIO_CACHE_DIR}\n")
-            log_file.write("-" * 40 + "\n\n")
+        with open(log_path, 'wb', buffering=LOG_BUFFER_SIZE) as log_file:
+            preamble = (
+                f"--- RUNNING SCRIPT VERSION {config.APP_VERSION} ---\n"
+                f"--- Starting {job_type.upper()} job {job_id} for project '{device_name}' ---\n"
+                + ("Env: ESPHOME_API_PASSWORD set to '********'\n" if api_password else "")
+                + f"Command: {' '.join(local_command)}\n"
+                f"Project Dir: {project_dir}\n"
+                f"PlatformIO Cache: {config.PLATFORMIO_CACHE_DIR}\n"
+                + "-" * 40 + "\n\n"
+            )
+            log_file.write(preamble.encode())
             log_file.flush()
 
             if job_type == 'compile':
@@ -107,83 +121,132 @@ def run_esphome_task(job_id, project_dir, yaml_filename, device_name, log_path,
                 local_command,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                encoding='utf-8',
+                bufsize=PIPE_READ_SIZE,
                 cwd=project_dir if job_type == 'compile' else None,
                 env=env
             )
             
-            last_lines = [] 
-            for line in process.stdout:
-                log_file.write(line)
-                log_file.flush()
-                line_stripped = line.strip()
-                if not line_stripped: continue
-                last_lines.append(line_stripped)
-                if len(last_lines) > 10: last_lines.pop(0)
-                for event in parser.parse_line(line_stripped):
-                    _broadcast_log(job_id, event)
+            # read1() returns whatever the pipe has ready, so output stays live.
+            # Output is written to the log as raw bytes; splitlines() breaks on
+            # \r as well as \n, like text-mode pipes did, and each line is only
+            # decoded when handed to the parser.
+            carry = b''
+            last_lines = deque(maxlen=10)
+            unflushed = False
+            unflushed_lines = 0
+            last_flush = time.monotonic()
+            while True:
+                # A build that goes quiet must not leave its tail in the log buffer,
+                # so with output pending the pipe is only waited on until the flush
+                # interval runs out.
+                if unflushed:
+                    wait = LOG_FLUSH_INTERVAL - (time.monotonic() - last_flush)
+                    if wait <= 0 or not select.select((process.stdout,), (), (), wait)[0]:
+                        log_file.flush()
+                        unflushed = False
+                        unflushed_lines = 0
+                        last_flush = time.monotonic()
+                chunk = process.stdout.read1(PIPE_READ_SIZE)
+                log_file.write(chunk)
+                lines = (carry + chunk).splitlines()
+                carry = lines.pop() if chunk and not chunk.endswith((b'\n', b'\r')) else b''
+                unflushed = unflushed or bool(chunk)
+                unflushed_lines += len(lines)
+                if unflushed_lines >= LOG_FLUSH_LINES:
+                    log_file.flush()
+                    unflushed = False
+                    unflushed_lines = 0
+                    last_flush = time.monotonic()
+                for line in lines:
+                    line_stripped = line.strip()
+                    if not line_stripped: continue
+                    line_stripped = line_stripped.decode('utf-8', errors='replace')
+                    last_lines.append(line_stripped)
+                    for event in parser.parse_line(line_stripped):
+                        _broadcast_log(job_id, event)
+                if not chunk: break
+            log_file.flush()
             process.wait()
             
             end_time = datetime.datetime.now()
             duration = (end_time - start_time).total_seconds()
-            log_file.write(f"\n{'-' * 40}\n--- Job finished at {end_time.isoformat()} ---\n")
-            log_file.write(f"Return Code: {process.returncode}\nDuration: {duration:.2f} seconds\n")
+            log_file.write(f"\n{'-' * 40}\n--- Job finished at {end_time.isoformat()} ---\n".encode())
+            log_file.write(f"Return Code: {process.returncode}\nDuration: {duration:.2f} seconds\n".encode())
             
             for event in parser.finalize(): _broadcast_log(job_id, event)
             
-            with JOBS_DB_LOCK:
-                job_details = JOBS_DB[job_id]
-                job_details["end_time"] = end_time.isoformat()
-                job_details["duration"] = duration
-                
-                is_upload_success = any("Successfully uploaded" in l or "===== [SUCCESS]" in l for l in last_lines)
-                is_auth_fail = any("Authentication invalid" in l for l in last_lines)
+            is_upload_success = is_auth_fail = False
+            for l in last_lines:
+                if not is_upload_success and ("Successfully uploaded" in l or "===== [SUCCESS]" in l):
+                    is_upload_success = True
+                if not is_auth_fail and "Authentication invalid" in l:
+                    is_auth_fail = True
+                if is_upload_success and is_auth_fail:
+                    break
+            
+            # Collect the final job fields first, then write them in one atomic call
+            updates = {"end_time": end_time.isoformat(), "duration": duration}
+            if process.returncode == 0 and (is_upload_success or job_type == "compile"):
+                log_file.write(b"Status: SUCCESS\n")
+                source_binary_path = _find_firmware_bin(project_dir, device_name)
                 
-                if process.returncode == 0 and (is_upload_success or job_type == "compile"):
-                    log_file.write("Status: SUCCESS\n")
-                    source_binary_path = _find_firmware_bin(project_dir, device_name)
+                if source_binary_path and os.path.exists(source_binary_path):
+                    final_binary_name = f"{job_id}-{device_name}-firmware.bin"
+                    final_binary_path = os.path.join(config.BINARIES_DIR, final_binary_name)
+                    shutil.copyfile(source_binary_path, final_binary_path)
                     
-                    if source_binary_path and os.path.exists(source_binary_path):
-                        final_binary_name = f"{job_id}-{device_name}-firmware.bin"
-                        final_binary_path = os.path.join(config.BINARIES_DIR, final_binary_name)
-                        shutil.copy(source_binary_path, final_binary_path)
-                        
-                        job_details["status"] = "success"
-                        job_details["binary_file"] = final_binary_name
-                        logging.info(f"Job {job_id}: {job_type.upper()} SUCCESS. Binary at {final_binary_path}")
-                        
-                        if job_type == "compile":
-                            for event in parser.parse_line("[SUCCESS] Build Succeeded"): _broadcast_log(job_id, event)
-                    else:
-                        log_msg = f"Source binary not found in {project_dir}"
-                        logging.error(f"Job {job_id}: Succeeded but {log_msg}")
-                        log_file.write(f"Status: FAILED ({log_msg})\n")
-                        job_details["status"] = "failed"
-                        job_details["error"] = log_msg
-                        for event in parser.parse_line(f"[FAILED] Error: {log_msg}"): _broadcast_log(job_id, event)
+                    updates["status"] = "success"
+                    updates["binary_file"] = final_binary_name
+                    logging.info("Job %s: %s SUCCESS. Binary at %s", job_id, job_type.upper(), final_binary_path)
+                    
+                    if job_type == "compile":
+                        for event in parser.parse_line("[SUCCESS] Build Succeeded"): _broadcast_log(job_id, event)
                 else:
-                    logging.error(f"Job {job_id}: {job_type.upper()} FAILED. Check log: {log_path}")
-                    log_file.write("Status: FAILED\n")
-                    job_details["status"] = "failed"
-                    if is_auth_fail: job_details["error"] = "Upload failed: Authentication Invalid."
-                    else: job_details["error"] = "Process failed. Check log for details."
-                    for event in parser.parse_line(f"[FAILED] Error: Process returned code {process.returncode}"):
-                        _broadcast_log(job_id, event)
+                    log_msg = f"Source binary not found in {project_dir}"
+                    logging.error("Job %s: Succeeded but %s", job_id, log_msg)
+                    log_file.write(f"Status: FAILED ({log_msg})\n".encode())
+                    updates["status"] = "failed"
+                    updates["error"] = log_msg
+                    for event in parser.parse_line(f"[FAILED] Error: {log_msg}"): _broadcast_log(job_id, event)
+            else:
+                logging.error("Job %s: %s FAILED. Check log: %s", job_id, job_type.upper(), log_path)
+                log_file.write(b"Status: FAILED\n")
+                updates["status"] = "failed"
+                if is_auth_fail: updates["error"] = "Upload failed: Authentication Invalid."
+                else: updates["error"] = "Process failed. Check log for details."
+                for event in parser.parse_line(f"[FAILED] Error: Process returned code {process.returncode}"):
+                    _broadcast_log(job_id, event)
+            
+            JOBS_DB.update(job_id, updates)
 
     except Exception as e:
-        logging.error(f"Job {job_id}: Worker thread crashed: {e}")
+        logging.error("Job %s: Worker thread crashed: %s", job_id, e)
         try:
-            with JOBS_DB_LOCK:
-                JOBS_DB[job_id]["status"] = "failed"
-                JOBS_DB[job_id]["error"] = f"Python worker crashed: {e}"
+            JOBS_DB.update(job_id, {"status": "failed", "error": f"Python worker crashed: {e}"})
             with open(log_path, 'a') as log_file:
                 log_file.write(f"\n--- PYTHON WORKER CRASHED ---\n{e}\n")
-            _broadcast_log(job_id, {'event': 'milestone', 'milestone': 'Server Crash', 'id': f"step-{uuid.uuid4().hex}", 'line': f'Error: {e}'})
+            _broadcast_log(job_id, {'event': 'milestone', 'milestone': 'Server Crash', 'id': _new_step_id(), 'line': f'Error: {e}'})
         except: pass 
     finally:
         _broadcast_log(job_id, {'event': 'CLOSE'})
-        with JOB_LOG_BROADCASTER_LOCK:
-            if job_id in JOB_LOG_BROADCASTER: del JOB_LOG_BROADCASTER[job_id]
-        logging.info(f"Job {job_id}: Task completed.")
+        retire_log_channel(job_id)
+        logging.info("Job %s: Task completed.", job_id)
+
 
+@lru_cache(maxsize=1)
+def _local_executor():
+    """In-process job pool, created on first use when use_local_executor is enabled."""
+    return ThreadPoolExecutor(max_workers=config.MAX_CONCURRENT_JOBS, thread_name_prefix='esphome-job')
+
+def submit_job(*args):
+    """
+    Queues run_esphome_task with the given arguments.
+    Goes through Celery unless use_local_executor is set, in which case the
+    task runs on a local pool with no broker round trip.
+    """
+    if config.USE_LOCAL_EXECUTOR:
+        # Open the log channel now, so viewers of the still-pending job follow it live
+        get_log_channel(args[0])
+        _local_executor().submit(run_esphome_task, *args)
+    else:
+        run_esphome_task.delay(*args)
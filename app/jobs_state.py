@@ -5,13 +5,213 @@ This file exists to break circular dependencies.
 Other modules can safely import these state objects.
 """
 
+import logging
+import os
 import threading
-from .redis_db import RedisJobDB
+import time
+
+import orjson
+
+from .redis_db import RedisJobDB, AsyncRedisJobDB
+from .services import LogParser
 
 # Redis-backed "database" to track job status (shared across processes)
 JOBS_DB = RedisJobDB()
-JOBS_DB_LOCK = threading.Lock()  # Keep for compatibility, but Redis handles locking
+# Same store for async (FastAPI) handlers, so they never block the event loop
+ASYNC_JOBS_DB = AsyncRedisJobDB()
+# Every JOBS_DB call, including partial updates, is atomic in Redis, so no caller takes a lock.
+
+def sse_frame(payload):
+    """
+    Serializes one event dict as a ready-to-send SSE frame.
+    Plain log lines go out as a named 'log' event carrying the raw text,
+    so neither side has to JSON-encode the bulk of the stream.
+    """
+    if len(payload) == 2 and payload.get('event') == 'log':
+        line = payload['line']
+        if '\n' not in line and '\r' not in line:
+            return b"event: log\ndata: " + line.encode('utf-8', 'replace') + b"\n\n"
+    return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+# Frame sent last on every log stream; compare with 'is' to detect the end
+CLOSE_FRAME = sse_frame({'event': 'CLOSE'})
+
+# Frames kept in memory per job, so late subscribers can catch up without the log file
+LOG_CHANNEL_MAX_FRAMES = 4096
+# Closed channels kept around to serve replays of recently finished jobs
+LOG_CHANNEL_RETAINED = 32
+
+class JobLogChannel:
+    """
+    Append-only stream of SSE frames for one job.
+    The single publisher appends each event once, already serialized, and
+    listeners keep their own read index, so publishing never waits on or
+    loops over subscribers. Only the newest LOG_CHANNEL_MAX_FRAMES frames
+    are kept.
+    """
+
+    def __init__(self):
+        # (absolute index of frames[0], frames), rebound as one object when trimmed
+        self._window = (0, [])
+        self.closed = False
+        # Replaced on every publish; listeners grab it before checking for new
+        # frames, so a wakeup can never be missed between the check and the wait
+        self.wakeup = threading.Event()
+
+    @property
+    def complete(self):
+        """True while no frame has been trimmed, i.e. the full stream is in memory."""
+        return self._window[0] == 0
+
+    def publish(self, payload):
+        """Appends one event and wakes every waiting listener."""
+        base, frames = self._window
+        if len(frames) >= LOG_CHANNEL_MAX_FRAMES:
+            # Trim into a new list so listeners holding the old window stay consistent
+            drop = LOG_CHANNEL_MAX_FRAMES // 4
+            base, frames = base + drop, frames[drop:]
+            self._window = (base, frames)
+        if payload.get('event') == 'CLOSE':
+            frames.append(CLOSE_FRAME)
+            self.closed = True
+        else:
+            frames.append(sse_frame(payload))
+        wakeup, self.wakeup = self.wakeup, threading.Event()
+        wakeup.set()
 
-# Pub/Sub for live log streaming
+    def listen(self, timeout=30):
+        """
+        Yields the retained frames, then new ones as they arrive, until the channel is closed.
+        Frames that are already waiting are joined into one chunk.
+        """
+        idx = 0
+        while True:
+            # Read before the window: publish() appends CLOSE_FRAME before setting
+            # closed, so once this is True the window below holds the whole stream
+            closed = self.closed
+            wakeup = self.wakeup
+            base, frames = self._window
+            idx = max(idx, base)
+            end = base + len(frames)
+            if idx < end:
+                # Everything published since the last pass goes out as one write
+                yield b"".join(frames[idx - base:end - base])
+                idx = end
+                if not closed:
+                    # More may have been published while the consumer was suspended
+                    continue
+            if closed:
+                return
+            wakeup.wait(timeout)
+
+# Pub/Sub for live log streaming: job_id -> JobLogChannel
 JOB_LOG_BROADCASTER = {}
 JOB_LOG_BROADCASTER_LOCK = threading.Lock()
+
+def get_log_channel(job_id):
+    """Returns the log channel for a job, creating it on first use by the process that runs the job."""
+    channel = JOB_LOG_BROADCASTER.get(job_id)
+    if channel is None:
+        with JOB_LOG_BROADCASTER_LOCK:
+            channel = JOB_LOG_BROADCASTER.get(job_id)
+            if channel is None:
+                channel = JOB_LOG_BROADCASTER[job_id] = JobLogChannel()
+    return channel
+
+def retire_log_channel(job_id):
+    """
+    Called once a job's stream is closed. The channel stays resident for replays,
+    and the oldest closed channels beyond LOG_CHANNEL_RETAINED are dropped.
+    """
+    with JOB_LOG_BROADCASTER_LOCK:
+        closed = [jid for jid, channel in JOB_LOG_BROADCASTER.items() if channel.closed]
+        for jid in closed[:-LOG_CHANNEL_RETAINED]:
+            del JOB_LOG_BROADCASTER[jid]
+
+def live_log_channel(job_id):
+    """
+    The channel to stream a job's log from, or None when the log file has to be read instead.
+    Only jobs run by this process have a channel; a job running in another process
+    (e.g. a Celery worker) is never published here, so its log file is tailed instead
+    of waiting on a channel nobody writes to.
+    """
+    channel = JOB_LOG_BROADCASTER.get(job_id)
+    if channel is None:
+        return None
+    if not channel.closed or channel.complete:
+        # Still running here, or finished with its whole stream still in memory
+        return channel
+    return None
+
+# Preamble lines written by the job runner that are not part of the ESPHome output
+_SKIP_PREFIXES = ("---", "Command:", "Project Dir:", "PlatformIO Cache:", "Env:")
+# Log replay reads the file in large chunks and sends frames in batches
+REPLAY_READ_SIZE = 1 << 20
+REPLAY_BATCH_FRAMES = 64
+# How often a followed log file is re-read once the reader has caught up
+LOG_TAIL_INTERVAL = 0.5
+# Statuses after which a job's log file is never written again
+FINAL_JOB_STATUSES = frozenset(('success', 'failed'))
+
+def _job_running(job_id):
+    """True while the job exists and has not reached a final status."""
+    status = JOBS_DB.get_field(job_id, 'status')
+    return status is not None and status not in FINAL_JOB_STATUSES
+
+def replay_log_frames(job_id, log_path, follow=False):
+    """
+    Re-parses a job's log file into batches of SSE frames, ending with CLOSE_FRAME.
+    With follow=True the file is tailed until the job reaches a final status, for
+    jobs that run in another process (e.g. a Celery worker) and so have no channel here.
+    """
+    logging.info("%s log file for job %s", "Following" if follow else "Replaying", job_id)
+    parser = LogParser()
+    batch = []
+
+    def parse(line):
+        line_stripped = line.strip()
+        if line_stripped and not line_stripped.startswith(_SKIP_PREFIXES):
+            for event in parser.parse_line(line_stripped):
+                batch.append(sse_frame(event))
+
+    try:
+        # A pending job has not opened its log yet
+        while follow and not os.path.exists(log_path) and _job_running(job_id):
+            time.sleep(LOG_TAIL_INTERVAL)
+        with open(log_path, 'r', encoding='utf-8', errors='replace', buffering=REPLAY_READ_SIZE) as log_file:
+            partial = ''
+            while True:
+                for line in log_file:
+                    if follow and not line.endswith('\n'):
+                        # The writer is mid-line; the rest arrives with a later read
+                        partial += line
+                        continue
+                    parse(partial + line)
+                    partial = ''
+                    if len(batch) >= REPLAY_BATCH_FRAMES:
+                        yield b"".join(batch)
+                        batch.clear()
+                if not follow:
+                    break
+                if batch:
+                    yield b"".join(batch)
+                    batch.clear()
+                # Checked before the next read, so output written just before the
+                # job finished is still picked up by one last pass
+                follow = _job_running(job_id)
+                if follow:
+                    time.sleep(LOG_TAIL_INTERVAL)
+            if partial:
+                parse(partial)
+        for event in parser.finalize():
+            batch.append(sse_frame(event))
+        if batch:
+            yield b"".join(batch)
+    except FileNotFoundError:
+        logging.error("Cannot replay log: File not found %s", log_path)
+        yield sse_frame({'event': 'milestone', 'milestone': 'Error: Log file not found', 'id': 'err'})
+    except Exception as e:
+        logging.error("Error replaying log %s: %s", job_id, e)
+        yield sse_frame({'event': 'milestone', 'milestone': f'Error: {e}', 'id': 'err'})
+    finally:
+        yield CLOSE_FRAME
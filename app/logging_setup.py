@@ -0,0 +1,31 @@
+"""
+Process-wide logging setup shared by the Flask and FastAPI apps.
+
+Request handlers only enqueue records; a background thread does the
+formatting and I/O.
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+
+from .app_config import config
+
+_log_listener = None
+
+def setup_logging():
+    """Routes the root logger through a QueueHandler; later calls are no-ops."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    # Explicit datefmt skips the per-record millisecond formatting of the default
+    log_handler = logging.StreamHandler()
+    log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+    log_queue = queue.SimpleQueue()
+    _log_listener = logging.handlers.QueueListener(log_queue, log_handler, respect_handler_level=True)
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(getattr(logging, config.LOG_LEVEL, logging.INFO))
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
@@ -1,8 +1,8 @@
 import uvicorn
 from fastapi import FastAPI
-import logging
-from .app_config import config, settings
+from .app_config import settings
 from .celery_app import celery
+from .logging_setup import setup_logging
 from .routers import jobs
 # from .routes import main_bp
 
@@ -12,9 +12,7 @@ app = FastAPI(
     openapi_url="/api/v1/openapi.json",
 )
 
-# Set logging level from config
-log_level_numeric = getattr(logging, config.LOG_LEVEL, logging.INFO)
-logging.basicConfig(level=log_level_numeric, format='%(asctime)s - %(levelname)s - %(message)s')
+setup_logging()
 
 # Initialize Celery with Flask app context
 celery.conf.update(settings)
@@ -1,62 +1,305 @@
 """
 Redis-backed job database
+
+Each job is stored as a Redis hash ('job:<id>') with one JSON-encoded
+value per field, so single fields can be read or written on their own.
 """
 
 import os
-import json
-import redis
+import time
 import threading
 
+import orjson
+import redis
+import redis.asyncio as redis_async
+from redis.cache import CacheConfig
+
+# Job ids are hex strings; each job lives at JOB_KEY_PREFIX + job_id
+JOB_KEY_PREFIX = "job:"
+# Set of all job ids, so enumeration never has to sweep the keyspace
+INDEX_KEY = "jobs:index"
+# Sorted set of job ids scored by write time
+BY_TIME_KEY = "jobs:by_time"
+# Counter bumped on every job write, so readers can tell when cached views are stale
+VERSION_KEY = "jobs:version"
+# Jobs fetched per pipelined round trip when enumerating
+BATCH_SIZE = 1000
+
+# Replaces a job hash and maintains both indexes in one atomic server-side call.
+# KEYS: job hash, index set, by-time zset, version counter. ARGV: job_id, timestamp, field, value, ...
+_SET_JOB_LUA = """
+redis.call('DEL', KEYS[1])
+if #ARGV > 2 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+    redis.call('SADD', KEYS[2], ARGV[1])
+    redis.call('ZADD', KEYS[3], ARGV[2], ARGV[1])
+else
+    redis.call('SREM', KEYS[2], ARGV[1])
+    redis.call('ZREM', KEYS[3], ARGV[1])
+end
+redis.call('INCR', KEYS[4])
+return 1
+"""
+
+# Writes some fields of an existing job, never recreating one deleted meanwhile.
+# KEYS: job hash, version counter. ARGV: field, value, ... Returns 0 if the job is missing.
+_UPDATE_JOB_LUA = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+if #ARGV > 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV))
+    redis.call('INCR', KEYS[2])
+end
+return 1
+"""
+
+def _job_key(job_id):
+    """Redis key for a job."""
+    return JOB_KEY_PREFIX + str(job_id)
+
+def _encode_job(value):
+    """Encodes each field of a job dict for storage in a hash."""
+    return {k: orjson.dumps(v) for k, v in value.items()}
+
+def _decode_job(raw):
+    """Decodes a hash returned by HGETALL back into a job dict."""
+    return {k: orjson.loads(v) for k, v in raw.items()}
+
+def _set_job_args(job_id, value):
+    """Builds the (keys, args) pair for the _SET_JOB_LUA script."""
+    args = [str(job_id), time.time()]
+    for k, v in _encode_job(value).items():
+        args.append(k)
+        args.append(v)
+    return [_job_key(job_id), INDEX_KEY, BY_TIME_KEY, VERSION_KEY], args
+
+def _connection_options():
+    """Returns the Redis URL and client options shared by the sync and async clients."""
+    redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    # redis-py already sets TCP_NODELAY on every connection it opens
+    options = {
+        'decode_responses': True,
+        'max_connections': int(os.environ.get('REDIS_MAX_CONNECTIONS', 32)),
+        'socket_keepalive': True,
+        'socket_timeout': 5,
+        'socket_connect_timeout': 2,
+        'health_check_interval': 30,
+    }
+    return redis_url, options
+
 class RedisJobDB:
-    """Thread-safe Redis-backed job database."""
-    
+    """
+    Thread-safe Redis-backed job database.
+    Every command is atomic server-side and the connection pool is
+    thread-safe, so no client-side lock is taken; multi-command writes
+    use MULTI/EXEC pipelines instead.
+    """
+
     def __init__(self):
-        redis_url = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
-        self.redis_client = redis.from_url(redis_url, decode_responses=True)
-        self._lock = threading.Lock()
-    
-    def _key(self, job_id):
-        return f"job:{job_id}"
-    
+        self._redis_url, self._options = _connection_options()
+        # With long-lived worker threads, give each thread its own small client so
+        # threads never contend on a shared pool. Off by default because the web
+        # server runs each request on a fresh thread.
+        self._per_thread = os.environ.get('REDIS_PER_THREAD_CLIENTS', '').lower() in ('1', 'true', 'yes')
+        if self._per_thread:
+            self._options['max_connections'] = int(os.environ.get('REDIS_THREAD_CONNECTIONS', 2))
+        self._tls = threading.local()
+        self._shared_client = None if self._per_thread else self._new_client()
+        self._set_job = self.redis_client.register_script(_SET_JOB_LUA)
+        self._update_job = self.redis_client.register_script(_UPDATE_JOB_LUA)
+
+    def _new_client(self):
+        # RESP3 client-side caching: repeated reads of unchanged jobs are served
+        # locally and Redis pushes invalidations when a key changes (Redis 6+)
+        return redis.from_url(self._redis_url, protocol=3, cache_config=CacheConfig(), **self._options)
+
+    @property
+    def redis_client(self):
+        """The shared client, or this thread's own client when per-thread clients are enabled."""
+        if not self._per_thread:
+            return self._shared_client
+        client = getattr(self._tls, 'client', None)
+        if client is None:
+            client = self._tls.client = self._new_client()
+        return client
+
+    def _hgetall_many(self, job_ids):
+        """Fetches many jobs with one pipelined HGETALL batch instead of one round trip per key."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for job_id in job_ids:
+            pipe.hgetall(_job_key(job_id))
+        return pipe.execute()
+
+    def _iter_id_batches(self):
+        """Walks the job index with SSCAN, yielding lists of at most BATCH_SIZE ids."""
+        seen = set()  # SSCAN may return a member more than once
+        batch = []
+        for job_id in self.redis_client.sscan_iter(INDEX_KEY, count=BATCH_SIZE):
+            if job_id in seen:
+                continue
+            seen.add(job_id)
+            batch.append(job_id)
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     def __setitem__(self, job_id, value):
-        """Store job data in Redis."""
-        with self._lock:
-            self.redis_client.set(self._key(job_id), json.dumps(value))
-    
+        """Store job data in Redis, replacing any existing fields."""
+        keys, args = _set_job_args(job_id, value)
+        self._set_job(keys=keys, args=args, client=self.redis_client)
+
+    def __delitem__(self, job_id):
+        """Remove a job and its index entry."""
+        pipe = self.redis_client.pipeline()
+        pipe.delete(_job_key(job_id))
+        pipe.srem(INDEX_KEY, job_id)
+        pipe.zrem(BY_TIME_KEY, job_id)
+        pipe.incr(VERSION_KEY)
+        deleted, _, _, _ = pipe.execute()
+        if not deleted:
+            raise KeyError(job_id)
+
     def __getitem__(self, job_id):
         """Retrieve job data from Redis."""
-        with self._lock:
-            data = self.redis_client.get(self._key(job_id))
-            if data is None:
-                raise KeyError(job_id)
-            return json.loads(data)
-    
+        raw = self.redis_client.hgetall(_job_key(job_id))
+        if not raw:
+            raise KeyError(job_id)
+        return _decode_job(raw)
+
+    def update(self, job_id, fields):
+        """Write only the given fields of an existing job, atomically and in one round trip."""
+        args = []
+        for k, v in _encode_job(fields).items():
+            args.append(k)
+            args.append(v)
+        if not self._update_job(keys=[_job_key(job_id), VERSION_KEY], args=args, client=self.redis_client):
+            raise KeyError(job_id)
+
+    def get_field(self, job_id, field, default=None):
+        """Read a single field of a job without fetching the rest."""
+        data = self.redis_client.hget(_job_key(job_id), field)
+        return default if data is None else orjson.loads(data)
+
+    def get_fields(self, job_id, fields):
+        """Read several fields of a job in one HMGET; missing fields come back as None."""
+        values = self.redis_client.hmget(_job_key(job_id), fields)
+        return {f: None if v is None else orjson.loads(v) for f, v in zip(fields, values)}
+
     def get(self, job_id, default=None):
         """Get job data with default fallback."""
         try:
             return self[job_id]
         except KeyError:
             return default
-    
+
     def __contains__(self, job_id):
         """Check if job exists."""
-        with self._lock:
-            return self.redis_client.exists(self._key(job_id)) > 0
-    
+        return self.redis_client.exists(_job_key(job_id)) > 0
+
+    def __len__(self):
+        """Number of jobs, read from the index in O(1)."""
+        return self.redis_client.scard(INDEX_KEY)
+
+    def version(self):
+        """Write counter for the whole store; changes whenever any job is written or deleted."""
+        return int(self.redis_client.get(VERSION_KEY) or 0)
+
+    def iter_items(self):
+        """Yields (job_id, data) tuples one batch at a time instead of building a full list."""
+        for job_ids in self._iter_id_batches():
+            for job_id, raw in zip(job_ids, self._hgetall_many(job_ids)):
+                if raw:
+                    yield job_id, _decode_job(raw)
+
+    def iter_values(self):
+        """Yields job values one batch at a time."""
+        for _, job in self.iter_items():
+            yield job
+
     def values(self):
         """Get all job values."""
-        with self._lock:
-            keys = self.redis_client.keys("job:*")
-            return [json.loads(self.redis_client.get(k)) for k in keys if self.redis_client.get(k)]
-    
+        return list(self.iter_values())
+
+    def iter_values_newest_first(self):
+        """Yields job values ordered by the by-time index, newest first, so callers never sort."""
+        start = 0
+        while True:
+            job_ids = self.redis_client.zrevrange(BY_TIME_KEY, start, start + BATCH_SIZE - 1)
+            for raw in self._hgetall_many(job_ids):
+                if raw:
+                    yield _decode_job(raw)
+            if len(job_ids) < BATCH_SIZE:
+                break
+            start += BATCH_SIZE
+
+    def values_newest_first(self):
+        """Get all job values, newest first."""
+        return list(self.iter_values_newest_first())
+
     def items(self):
         """Get all job items as (job_id, data) tuples."""
-        with self._lock:
-            keys = self.redis_client.keys("job:*")
-            result = []
-            for k in keys:
-                data = self.redis_client.get(k)
-                if data:
-                    job_id = k.split(":", 1)[1]
-                    result.append((job_id, json.loads(data)))
-            return result
+        return list(self.iter_items())
+
+
+class AsyncRedisJobDB:
+    """
+    asyncio counterpart of RedisJobDB for the FastAPI handlers.
+    Uses the same key layout; methods are explicit because 'await' cannot
+    be used with __getitem__ and friends.
+    """
+
+    def __init__(self):
+        redis_url, options = _connection_options()
+        self.redis_client = redis_async.from_url(redis_url, **options)
+        self._set_job = self.redis_client.register_script(_SET_JOB_LUA)
+
+    async def get(self, job_id, default=None):
+        """Get job data with default fallback."""
+        raw = await self.redis_client.hgetall(_job_key(job_id))
+        return _decode_job(raw) if raw else default
+
+    async def set(self, job_id, value):
+        """Store job data in Redis, replacing any existing fields."""
+        keys, args = _set_job_args(job_id, value)
+        await self._set_job(keys=keys, args=args)
+
+    async def get_field(self, job_id, field, default=None):
+        """Read a single field of a job without fetching the rest."""
+        data = await self.redis_client.hget(_job_key(job_id), field)
+        return default if data is None else orjson.loads(data)
+
+    async def get_many(self, job_ids):
+        """Get several jobs in one pipelined round trip, as {job_id: data} for those that exist."""
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hgetall(_job_key(job_id))
+            values = await pipe.execute()
+        return {job_id: _decode_job(raw) for job_id, raw in zip(job_ids, values) if raw}
+
+    async def count(self):
+        """Number of jobs, read from the index in O(1)."""
+        return await self.redis_client.scard(INDEX_KEY)
+
+    async def iter_all(self):
+        """Yields job values one batch at a time, walking the index with SSCAN."""
+        seen = set()  # SSCAN may return a member more than once
+        batch = []
+        async for job_id in self.redis_client.sscan_iter(INDEX_KEY, count=BATCH_SIZE):
+            if job_id in seen:
+                continue
+            seen.add(job_id)
+            batch.append(job_id)
+            if len(batch) >= BATCH_SIZE:
+                for job in (await self.get_many(batch)).values():
+                    yield job
+                batch = []
+        if batch:
+            for job in (await self.get_many(batch)).values():
+                yield job
+
+    async def all(self):
+        """Get all job values."""
+        return [job async for job in self.iter_all()]
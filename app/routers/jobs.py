@@ -1,4 +1,9 @@
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool
+
+from ..jobs_state import ASYNC_JOBS_DB, replay_log_frames
 
 router = APIRouter(
     prefix="/jobs",
@@ -6,19 +11,67 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+# Stored job fields that are never sent back to clients
+_SECRET_FIELDS = ("api_password",)
+# Most ids one POST /jobs/batch request may ask for
+JOBS_BATCH_MAX = 100
+
+def _public_job(job):
+    """The job as returned to clients, with secret fields removed."""
+    for field in _SECRET_FIELDS:
+        job.pop(field, None)
+    return job
+
 @router.get("/")
 async def read_jobs():
-    return {"message": "List of jobs"}
+    """
+    Streams every job as newline-delimited JSON, one job per line.
+    To fetch specific jobs, prefer POST /jobs/batch.
+    """
+    async def job_lines():
+        async for job in ASYNC_JOBS_DB.iter_all():
+            yield orjson.dumps(_public_job(job)) + b"\n"
+    return StreamingResponse(job_lines(), media_type="application/x-ndjson")
+
+@router.get("/count")
+async def count_jobs():
+    return {"count": await ASYNC_JOBS_DB.count()}
 
 @router.post("/")
 async def create_job():
     return {"message": "Job created"}
 
+@router.post("/batch")
+async def read_jobs_batch(ids: list[str]):
+    """
+    Fetches several jobs in one request and one Redis round trip. Unknown ids are omitted.
+    At most JOBS_BATCH_MAX ids may be requested at once.
+    """
+    if len(ids) > JOBS_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {JOBS_BATCH_MAX} ids per request")
+    jobs = await ASYNC_JOBS_DB.get_many(ids)
+    return {job_id: _public_job(job) for job_id, job in jobs.items()}
 
 @router.get("/{job_id}")
-async def read_job(job_id: int):
-    return {"message": f"Details of job {job_id}"}
+async def read_job(job_id: str):
+    job = await ASYNC_JOBS_DB.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _public_job(job)
+
+@router.get("/{job_id}/log-stream")
+async def stream_job_log(job_id: str):
+    """
+    Server-Sent Event stream of a job's parsed log, read from the log file.
+    Jobs never run in this process, so a running job's file is tailed until
+    the job reaches a final status.
+    """
+    log_path = await ASYNC_JOBS_DB.get_field(job_id, "log_file")
+    if log_path is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    frames = iterate_in_threadpool(replay_log_frames(job_id, log_path, follow=True))
+    return StreamingResponse(frames, media_type="text/event-stream")
 
 @router.delete("/{job_id}")
 async def delete_job(job_id: int):
-    return {"message": f"Job {job_id} deleted"}
\ No newline at end of file
+    return {"message": f"Job {job_id} deleted"}
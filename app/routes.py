@@ -3,28 +3,75 @@ Flask routes (views) for the application.
 """
 
 import os
-import uuid
+import secrets
 import tempfile
 import shutil
 import datetime
-import json
-import queue
+import time
+import threading
+from functools import lru_cache
+from markupsafe import Markup
 from flask import (
     Blueprint, request, jsonify, send_from_directory, abort, 
-    render_template_string, Response, redirect, url_for, 
+    Response, redirect, url_for, stream_with_context,
     current_app as app
 )
 
 from .app_config import config
 from .jobs_state import (
-    JOBS_DB, JOBS_DB_LOCK, 
-    JOB_LOG_BROADCASTER, JOB_LOG_BROADCASTER_LOCK
+    JOBS_DB, live_log_channel, replay_log_frames, sse_frame
 )
-from .services import get_device_name_from_yaml, LogParser
-from .jobs import run_esphome_task
+from .logging_setup import setup_logging
+from .services import get_device_name_from_yaml
+from .jobs import submit_job
 
 main_bp = Blueprint('main', __name__)
 
+@main_bp.record_once
+def _configure_app(state):
+    """Applies config.ini settings that Flask reads from app.config, and sets up logging."""
+    state.app.config['USE_X_SENDFILE'] = config.USE_X_SENDFILE
+    # Before app.logger is first used, so Flask leaves it propagating to the root queue handler
+    setup_logging()
+
+# Binaries are named per job and never rewritten, so clients may cache them
+BINARY_MAX_AGE = 3600
+
+# Pre-built status badges for the dashboard rows, one per job status
+_STATUS_SPANS = {
+    status: Markup(f'<span class="status status-{status}">{status}</span>')
+    for status in ('pending', 'running', 'success', 'failed')
+}
+
+# job_id -> (row key, rendered row HTML); rows are only re-rendered when their key changes
+_ROW_CACHE = {}
+# How often /jobs/stream checks the store for changes, and how often it sends a keep-alive
+DASHBOARD_POLL_INTERVAL = 1.0
+DASHBOARD_KEEPALIVE_INTERVAL = 15.0
+# A /jobs/stream response ends after this many seconds, so a forgotten tab never
+# holds a server thread for good; EventSource reconnects by itself
+DASHBOARD_STREAM_MAX_AGE = 300.0
+# Latest _DashboardSnapshot, shared by the dashboard page and every /jobs/stream listener
+_DASHBOARD_SNAPSHOT = None
+# Guards _ROW_CACHE and _DASHBOARD_SNAPSHOT, so each store version is rendered once
+_DASHBOARD_LOCK = threading.Lock()
+# (JOBS_DB version, rendered HTML) of the last dashboard render
+_DASHBOARD_CACHE = (None, None)
+
+@lru_cache(maxsize=None)
+def _get_template(name):
+    """Compiles a page template once; render_template_string would re-parse it on every request."""
+    return app.jinja_env.from_string(_TEMPLATES[name])
+
+def _human_time(dt):
+    """Dashboard timestamp format, computed once when a job is created."""
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+def _render(name, **context):
+    """Renders a cached page template with the usual Flask template context."""
+    app.update_template_context(context)
+    return _get_template(name).render(context)
+
 @main_bp.route('/compile', methods=['POST'])
 def handle_compile_request():
     """API endpoint to submit a new *compile* job."""
@@ -32,11 +79,12 @@ def handle_compile_request():
     if not files or all(f.filename == '' for f in files):
         return jsonify({"success": False, "error": "No files provided in the request"}), 400
 
-    job_id = str(uuid.uuid4())
+    job_id = secrets.token_hex(16)
     main_yaml_filename = None
     main_yaml_path = None
     
-    temp_dir = tempfile.mkdtemp()
+    # Stage uploads on the same filesystem as the projects so the final move is a rename
+    temp_dir = tempfile.mkdtemp(prefix='.upload-', dir=config.PROJECTS_DIR)
     app.logger.info(f"Job {job_id}: Created temp dir: {temp_dir}")
     saved_files = []
 
@@ -66,40 +114,39 @@ def handle_compile_request():
              raise ValueError("Could not parse 'name:' from your YAML file. Make sure it's set.")
 
         project_dir = os.path.join(config.PROJECTS_DIR, device_name)
-        if not os.path.exists(project_dir):
-            os.makedirs(project_dir)
-            app.logger.info(f"Job {job_id}: Created new persistent project dir: {project_dir}")
+        os.makedirs(project_dir, exist_ok=True)
         
         for filename in saved_files:
-            shutil.move(
+            os.replace(
                 os.path.join(temp_dir, filename),
                 os.path.join(project_dir, filename)
             )
         app.logger.info(f"Job {job_id}: Saved files to project dir: {project_dir}")
         
         log_path = os.path.join(config.LOGS_DIR, f"{job_id}.log")
+        now = datetime.datetime.now()
         
-        with JOBS_DB_LOCK:
-            JOBS_DB[job_id] = {
-                "job_id": job_id,
-                "status": "pending",
-                "job_type": "compile", 
-                "target_device": None,
-                "api_password": None, 
-                "log_file": log_path,
-                "project_dir": project_dir,
-                "main_yaml": main_yaml_filename,
-                "device_name": device_name,
-                "submitted_time": datetime.datetime.now().isoformat(),
-                "start_time": None,
-                "end_time": None,
-                "duration": None,
-                "binary_file": None,
-                "error": None
-            }
+        JOBS_DB[job_id] = {
+            "job_id": job_id,
+            "status": "pending",
+            "job_type": "compile", 
+            "target_device": None,
+            "api_password": None, 
+            "log_file": log_path,
+            "project_dir": project_dir,
+            "main_yaml": main_yaml_filename,
+            "device_name": device_name,
+            "submitted_time": now.isoformat(),
+            "submitted_time_human": _human_time(now),
+            "start_time": None,
+            "end_time": None,
+            "duration": None,
+            "binary_file": None,
+            "error": None
+        }
         
-        # Submit to Celery
-        run_esphome_task.delay(
+        # Submit to Celery (or the local executor)
+        submit_job(
             job_id, project_dir, main_yaml_filename, device_name, 
             log_path, "compile", None, None
         )
@@ -122,27 +169,283 @@ def handle_compile_request():
         app.logger.error(f"Job {job_id}: Unhandled exception during submission: {e}")
         return jsonify({"success": False, "error": f"Unhandled server error: {e}"}), 500
     finally:
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+        shutil.rmtree(temp_dir, ignore_errors=True)
 
-@main_bp.route('/jobs', methods=['GET'])
-def get_jobs_dashboard():
-    """Renders an HTML dashboard of all jobs."""
-    with JOBS_DB_LOCK:
-        jobs_list = sorted(JOBS_DB.values(), key=lambda j: j['submitted_time'], reverse=True)
+def _dashboard_rows():
+    """
+    Returns ([(job_id, row_html), ...] newest first, active job count).
+    Rows are re-rendered only when their key changed since the last call.
+    Callers hold _DASHBOARD_LOCK.
+    """
+    global _ROW_CACHE
+    # Already ordered by the store's by-time index, and each value is a fresh copy
+    jobs_list = JOBS_DB.values_newest_first()
     
-    formatted_jobs = []
+    rows = []
+    row_cache = {}
     for job in jobs_list:
-        job_dict = job.copy()
-        job_dict['submitted_time_human'] = datetime.datetime.fromisoformat(job['submitted_time']).strftime('%Y-%m-%d %H:%M:%S')
-        if 'job_type' not in job_dict: job_dict['job_type'] = 'compile'
-        if 'device_name' not in job_dict: job_dict['device_name'] = job_dict.get('main_yaml', 'unknown') # Fallback
-        formatted_jobs.append(job_dict)
+        job_id = job['job_id']
+        # Everything else shown in a row is fixed when the job is created
+        key = (job.get('status'), job.get('duration'), job.get('binary_file'), job.get('error'))
+        cached = _ROW_CACHE.get(job_id)
+        if cached is not None and cached[0] == key:
+            row_html = cached[1]
+        else:
+            if 'submitted_time_human' not in job: # Jobs stored before the field existed
+                job['submitted_time_human'] = _human_time(datetime.datetime.fromisoformat(job['submitted_time']))
+            if 'job_type' not in job: job['job_type'] = 'compile'
+            if 'device_name' not in job: job['device_name'] = job.get('main_yaml', 'unknown') # Fallback
+            row_html = _render('dashboard_row', job=job, status_spans=_STATUS_SPANS)
+        row_cache[job_id] = (key, row_html)
+        rows.append((job_id, row_html))
+    # Rebuilt each render so deleted jobs fall out of the cache
+    _ROW_CACHE = row_cache
 
-    active_jobs = len([j for j in jobs_list if j.get('status') == 'running'])
-    
-    return render_template_string(
+    active_jobs = sum(1 for j in jobs_list if j.get('status') == 'running')
+    return rows, active_jobs
+
+class _DashboardSnapshot:
+    """Dashboard rows at one store version, with the SSE frames that bring a page up to it."""
+    __slots__ = ('version', 'rows', 'rows_by_id', 'active_jobs', 'prev_version', 'delta', '_full')
+
+    def __init__(self, version, rows, active_jobs, prev=None):
+        self.version = version
+        self.rows = rows
+        self.rows_by_id = dict(rows)
+        self.active_jobs = active_jobs
+        self.prev_version = None if prev is None else prev.version
+        self.delta = b''
+        if prev is not None:
+            # Oldest first, so the client can prepend new jobs in order
+            changed = [[job_id, html] for job_id, html in reversed(rows) if prev.rows_by_id.get(job_id) != html]
+            removed = [job_id for job_id in prev.rows_by_id if job_id not in self.rows_by_id]
+            if changed or removed or active_jobs != prev.active_jobs:
+                self.delta = sse_frame({'full': False, 'rows': changed, 'removed': removed, 'active_jobs': active_jobs})
+        self._full = None
+
+    def frame_since(self, version):
+        """
+        Returns the frame that brings a page showing 'version' up to this snapshot,
+        or b'' when there is nothing to send. Pages more than one snapshot behind
+        (or with no version) get every row.
         """
+        if version == self.version:
+            return b''
+        if version is not None and version == self.prev_version:
+            return self.delta
+        if self._full is None:
+            rows = [[job_id, html] for job_id, html in reversed(self.rows)]
+            self._full = sse_frame({'full': True, 'rows': rows, 'removed': [], 'active_jobs': self.active_jobs})
+        return self._full
+
+def _dashboard_snapshot():
+    """Returns the snapshot for the current store version, building it once however many listeners ask."""
+    global _DASHBOARD_SNAPSHOT
+    with _DASHBOARD_LOCK:
+        version = JOBS_DB.version()
+        snapshot = _DASHBOARD_SNAPSHOT
+        if snapshot is None or snapshot.version != version:
+            rows, active_jobs = _dashboard_rows()
+            snapshot = _DASHBOARD_SNAPSHOT = _DashboardSnapshot(version, rows, active_jobs, snapshot)
+        return snapshot
+
+@main_bp.route('/jobs', methods=['GET'])
+def get_jobs_dashboard():
+    """Renders an HTML dashboard of all jobs. Later changes arrive through /jobs/stream."""
+    global _DASHBOARD_CACHE
+    snapshot = _dashboard_snapshot()
+    cached_version, cached_html = _DASHBOARD_CACHE
+    if cached_version == snapshot.version:
+        return Response(cached_html, mimetype='text/html')
+
+    html = _render(
+        'dashboard',
+        rows="".join(row_html for _, row_html in snapshot.rows),
+        active_jobs=snapshot.active_jobs,
+        max_jobs=config.MAX_CONCURRENT_JOBS,
+        version=snapshot.version
+    ).encode('utf-8')
+    _DASHBOARD_CACHE = (snapshot.version, html)
+    return Response(html, mimetype='text/html')
+
+@main_bp.route('/jobs/stream', methods=['GET'])
+def stream_jobs_dashboard():
+    """
+    SSE stream of dashboard rows that changed since the page was rendered.
+    'since' is the store version the page was rendered at; when it is stale
+    (or missing, e.g. after a reconnect) the first message carries every row.
+    The change set for each version is computed once and shared by all listeners.
+    """
+    since = request.args.get('since', type=int)
+
+    def dashboard_updates():
+        version = since
+        started = last_sent = time.monotonic()
+        while time.monotonic() - started < DASHBOARD_STREAM_MAX_AGE:
+            snapshot = _dashboard_snapshot()
+            frame = snapshot.frame_since(version)
+            version = snapshot.version
+            if frame:
+                yield frame
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= DASHBOARD_KEEPALIVE_INTERVAL:
+                yield b": keep-alive\n\n"
+                last_sent = time.monotonic()
+            time.sleep(DASHBOARD_POLL_INTERVAL)
+
+    return Response(stream_with_context(dashboard_updates()), mimetype='text/event-stream', direct_passthrough=True)
+
+@main_bp.route('/job/<original_job_id>/upload', methods=['GET', 'POST'])
+def handle_upload_page(original_job_id):
+    """Shows a page to start an OTA upload for a previously successful compile job."""
+    job = JOBS_DB.get(original_job_id)
+        
+    if not job: abort(404, "Original compile job not found")
+    if job['status'] != 'success': abort(400, "Original job was not successful. Cannot upload.")
+
+    if request.method == 'POST':
+        target_device = request.form.get('target')
+        api_password = request.form.get('api_password')
+        if not target_device: return "Error: 'target' is required.", 400
+        
+        new_job_id = secrets.token_hex(16)
+        log_path = os.path.join(config.LOGS_DIR, f"{new_job_id}.log")
+        now = datetime.datetime.now()
+        
+        JOBS_DB[new_job_id] = {
+            "job_id": new_job_id,
+            "status": "pending",
+            "job_type": "upload",
+            "target_device": target_device,
+            "api_password": api_password if api_password else None, 
+            "original_job_id": original_job_id,
+            "log_file": log_path,
+            "project_dir": job['project_dir'], 
+            "main_yaml": job['main_yaml'],
+            "device_name": job['device_name'],
+            "submitted_time": now.isoformat(),
+            "submitted_time_human": _human_time(now),
+            "start_time": None,
+            "end_time": None,
+            "duration": None,
+            "binary_file": None,
+            "error": None
+        }
+        
+        # Submit to Celery (or the local executor)
+        submit_job(
+            new_job_id, job['project_dir'], job['main_yaml'], job['device_name'],
+            log_path, "upload", target_device, api_password
+        )
+        app.logger.info(f"Job {new_job_id}: Submitted UPLOAD task for {original_job_id} -> {target_device}")
+        return redirect(url_for('main.get_live_job_page', job_id=new_job_id))
+
+    return _render(
+        'upload',
+        job=job
+    )
+
+
+@main_bp.route('/job/<job_id>', methods=['GET'])
+def get_live_job_page(job_id):
+    """Renders the new live log streaming page."""
+    job = JOBS_DB.get(job_id)
+    if not job: abort(404, "Job not found")
+
+    return _render(
+        'live',
+        job=job
+    )
+
+
+@main_bp.route('/log-stream/<job_id>')
+def log_stream(job_id):
+    """Server-Sent Event (SSE) stream."""
+    log_path = JOBS_DB.get_field(job_id, 'log_file')
+    if not log_path: abort(404)
+
+    # Frames are already encoded bytes, so Werkzeug can pass them straight through
+    channel = live_log_channel(job_id)
+    if channel is None:
+        # Run elsewhere (e.g. by a Celery worker) or no longer in memory: tail the log file
+        frames = replay_log_frames(job_id, log_path, follow=True)
+        return Response(frames, mimetype='text/event-stream', direct_passthrough=True)
+
+    def subscribe_to_live_events():
+        try:
+            yield from channel.listen()
+        except GeneratorExit:
+            app.logger.info(f"Log stream client disconnected for job {job_id}")
+
+    return Response(subscribe_to_live_events(), mimetype='text/event-stream', direct_passthrough=True)
+
+
+@main_bp.route('/status/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Returns the JSON status for a single job."""
+    job = JOBS_DB.get(job_id)
+    if not job: abort(404, "Job not found")
+    return jsonify(job)
+
+@main_bp.route('/logs/<job_id>', methods=['GET'])
+def get_job_log(job_id):
+    """Returns the raw text log file for a job."""
+    log_path = JOBS_DB.get_field(job_id, 'log_file')
+    if not log_path: abort(404, "Job not found")
+    if not os.path.exists(log_path):
+        return "Log file not created yet. Job may be pending.", 200, {'Content-Type': 'text/plain'}
+    try:
+        # Logs grow while a job runs: always revalidate, but let unchanged logs answer 304
+        return send_from_directory(
+            os.path.dirname(log_path), os.path.basename(log_path),
+            mimetype='text/plain', conditional=True, max_age=0
+        )
+    except Exception as e:
+        app.logger.error(f"Could not send log file {log_path}: {e}")
+        return "Error reading log file.", 500, {'Content-Type': 'text/plain'}
+
+@main_bp.route('/download/<job_id>', methods=['GET'])
+def download_binary(job_id):
+    """Lets the user download the compiled binary if the job succeeded."""
+    # Only the two fields this view needs, in one round trip
+    fields = JOBS_DB.get_fields(job_id, ('status', 'binary_file'))
+    status, binary_file = fields['status'], fields['binary_file']
+    
+    if status is None: abort(404, "Job not found")
+    if status != 'success': abort(400, f"Job status is '{status}', not 'success'. Binary not available.")
+    if not binary_file: abort(404, "Job succeeded, but binary file reference is missing.")
+         
+    binary_path = os.path.join(config.BINARIES_DIR, binary_file)
+    if not os.path.exists(binary_path):
+        app.logger.error(f"Job {job_id} succeeded but binary file is missing from disk: {binary_path}")
+        abort(500, "Binary file not found on server, may have been cleaned up.")
+        
+    try:
+        return send_from_directory(
+            config.BINARIES_DIR,
+            binary_file,
+            as_attachment=True,
+            download_name=binary_file.split('-', 1)[-1],
+            conditional=True,
+            max_age=BINARY_MAX_AGE
+        )
+    except Exception as e:
+        app.logger.error(f"Could not send binary file {binary_path}: {e}")
+        abort(500, "Error sending binary file.")
+
+@main_bp.route('/', methods=['GET'])
+def index():
+    """Simple index page with instructions."""
+    return _render(
+        'index',
+        max_jobs=config.MAX_CONCURRENT_JOBS,
+        port=config.PORT
+    )
+
+
+# --- Page templates, compiled once by _get_template ---
+
+_DASHBOARD_TPL = """
         <!DOCTYPE html>
         <html lang="en">
         <head>
@@ -169,12 +472,11 @@ def get_jobs_dashboard():
                 .job-type { font-size: 0.8em; color: #888; display: block; margin-top: 4px; }
                 .device-name { font-weight: bold; display: block; }
             </style>
-            <meta http-equiv="refresh" content="5">
         </head>
         <body>
             <div class="header-info">
                 <h1>ESPHome Compile Jobs</h1>
-                <p><strong>{{ active_jobs }} / {{ max_jobs }}</strong> active workers</p>
+                <p><strong><span id="active-jobs">{{ active_jobs }}</span> / {{ max_jobs }}</strong> active workers</p>
             </div>
             <table>
                 <thead>
@@ -186,9 +488,54 @@ def get_jobs_dashboard():
                         <th>Actions</th>
                     </tr>
                 </thead>
-                <tbody>
-                    {% for job in jobs %}
-                    <tr>
+                <tbody id="jobs-body">
+                    {% if rows %}
+                    {{ rows|safe }}
+                    {% else %}
+                    <tr id="no-jobs">
+                        <td colspan="5" style="text-align: center; padding: 20px; color: #888;">No jobs submitted yet.</td>
+                    </tr>
+                    {% endif %}
+                </tbody>
+            </table>
+            <script>
+                const jobsBody = document.getElementById('jobs-body');
+                const activeJobs = document.getElementById('active-jobs');
+                const findRow = (jobId) => jobsBody.querySelector('tr[data-job-id="' + jobId + '"]');
+
+                // Patches changed rows in place instead of reloading the whole page
+                const eventSource = new EventSource("{{ url_for('main.stream_jobs_dashboard', since=version) }}");
+                eventSource.onmessage = function(event) {
+                    const update = JSON.parse(event.data);
+                    activeJobs.textContent = update.active_jobs;
+                    if (update.full) {
+                        const current = new Set(update.rows.map(([jobId]) => jobId));
+                        jobsBody.querySelectorAll('tr[data-job-id]').forEach(function(row) {
+                            if (!current.has(row.dataset.jobId)) row.remove();
+                        });
+                    }
+                    update.removed.forEach(function(jobId) {
+                        const row = findRow(jobId);
+                        if (row) row.remove();
+                    });
+                    update.rows.forEach(function([jobId, html]) {
+                        const template = document.createElement('template');
+                        template.innerHTML = html.trim();
+                        const newRow = template.content.firstElementChild;
+                        const oldRow = findRow(jobId);
+                        if (oldRow) oldRow.replaceWith(newRow); else jobsBody.prepend(newRow);
+                    });
+                    const placeholder = document.getElementById('no-jobs');
+                    if (placeholder && jobsBody.querySelector('tr[data-job-id]')) placeholder.remove();
+                };
+            </script>
+        </body>
+        </html>
+        """
+
+# One dashboard row; rendered per job and cached in _ROW_CACHE
+_DASHBOARD_ROW_TPL = """
+                    <tr data-job-id="{{ job.job_id }}">
                         <td class="mono">
                             <span class="device-name">{{ job.device_name }}</span>
                             {{ job.job_id }}
@@ -200,7 +547,7 @@ def get_jobs_dashboard():
                                 {% endif %}
                             </span>
                         </td>
-                        <td><span class="status status-{{ job.status }}">{{ job.status }}</span></td>
+                        <td>{% if job.status in status_spans %}{{ status_spans[job.status] }}{% else %}<span class="status status-{{ job.status }}">{{ job.status }}</span>{% endif %}</td>
                         <td>{{ job.submitted_time_human }}</td>
                         <td>{{ "%.2f s" % job.duration if job.duration else "N/A" }}</td>
                         <td>
@@ -217,68 +564,9 @@ def get_jobs_dashboard():
                             {% endif %}
                         </td>
                     </tr>
-                    {% else %}
-                    <tr>
-                        <td colspan="5" style="text-align: center; padding: 20px; color: #888;">No jobs submitted yet.</td>
-                    </tr>
-                    {% endfor %}
-                </tbody>
-            </table>
-        </body>
-        </html>
-        """,
-        jobs=formatted_jobs,
-        active_jobs=active_jobs,
-        max_jobs=config.MAX_CONCURRENT_JOBS
-    )
-
-@main_bp.route('/job/<original_job_id>/upload', methods=['GET', 'POST'])
-def handle_upload_page(original_job_id):
-    """Shows a page to start an OTA upload for a previously successful compile job."""
-    with JOBS_DB_LOCK:
-        job = JOBS_DB.get(original_job_id)
-        
-    if not job: abort(404, "Original compile job not found")
-    if job['status'] != 'success': abort(400, "Original job was not successful. Cannot upload.")
-
-    if request.method == 'POST':
-        target_device = request.form.get('target')
-        api_password = request.form.get('api_password')
-        if not target_device: return "Error: 'target' is required.", 400
-        
-        new_job_id = str(uuid.uuid4())
-        log_path = os.path.join(config.LOGS_DIR, f"{new_job_id}.log")
-        
-        with JOBS_DB_LOCK:
-            JOBS_DB[new_job_id] = {
-                "job_id": new_job_id,
-                "status": "pending",
-                "job_type": "upload",
-                "target_device": target_device,
-                "api_password": api_password if api_password else None, 
-                "original_job_id": original_job_id,
-                "log_file": log_path,
-                "project_dir": job['project_dir'], 
-                "main_yaml": job['main_yaml'],
-                "device_name": job['device_name'],
-                "submitted_time": datetime.datetime.now().isoformat(),
-                "start_time": None,
-                "end_time": None,
-                "duration": None,
-                "binary_file": None,
-                "error": None
-            }
-        
-        # Submit to Celery
-        run_esphome_task.delay(
-            new_job_id, job['project_dir'], job['main_yaml'], job['device_name'],
-            log_path, "upload", target_device, api_password
-        )
-        app.logger.info(f"Job {new_job_id}: Submitted UPLOAD task for {original_job_id} -> {target_device}")
-        return redirect(url_for('main.get_live_job_page', job_id=new_job_id))
+"""
 
-    return render_template_string(
-        """
+_UPLOAD_TPL = """
         <!DOCTYPE html>
         <html lang="en">
         <head>
@@ -318,20 +606,9 @@ def handle_upload_page(original_job_id):
             </div>
         </body>
         </html>
-        """, 
-        job=job
-    )
-
-
-@main_bp.route('/job/<job_id>', methods=['GET'])
-def get_live_job_page(job_id):
-    """Renders the new live log streaming page."""
-    with JOBS_DB_LOCK:
-        job = JOBS_DB.get(job_id)
-    if not job: abort(404, "Job not found")
-
-    return render_template_string(
         """
+
+_LIVE_TPL = """
         <!DOCTYPE html>
         <html lang="en">
         <head>
@@ -440,7 +717,9 @@ def get_live_job_page(job_id):
                             break;
                         case 'log': addLogLine(data.line); break;
                         case 'progress': updateProgressBar(data.data); break;
-                        case 'update_summary': updateSummaryText(data.target_id, data.text); break;
+                        case 'update_summary':
+                            updateSummaryText(data.target_id, data.text ?? `Compiling C/C++ Sources & Archiving (${data.count} files...)`);
+                            break;
                         case 'CLOSE':
                             eventSource.close();
                             fetch("{{ url_for('main.get_job_status', job_id=job.job_id) }}")
@@ -460,6 +739,7 @@ def get_live_job_page(job_id):
                             break;
                     }
                 };
+                eventSource.addEventListener('log', function(event) { addLogLine(event.data); });
                 eventSource.onerror = function(err) {
                     createNewStep('Error');
                     addLogLine('--- Lost connection to log stream. Stopping. ---');
@@ -469,123 +749,9 @@ def get_live_job_page(job_id):
             </script>
         </body>
         </html>
-        """, 
-        job=job
-    )
-
-
-@main_bp.route('/log-stream/<job_id>')
-def log_stream(job_id):
-    """Server-Sent Event (SSE) stream."""
-    with JOBS_DB_LOCK:
-        job = JOBS_DB.get(job_id)
-        if not job: abort(404)
-        status = job['status']
-        log_path = job['log_file']
-
-    def subscribe_to_live_events():
-        listener_queue = queue.Queue()
-        with JOB_LOG_BROADCASTER_LOCK:
-            if job_id not in JOB_LOG_BROADCASTER: JOB_LOG_BROADCASTER[job_id] = []
-            JOB_LOG_BROADCASTER[job_id].append(listener_queue)
-        try:
-            while True:
-                log_data = listener_queue.get()
-                yield f"data: {json.dumps(log_data)}\n\n"
-                if log_data.get('event') == 'CLOSE': break
-        except GeneratorExit:
-            app.logger.info(f"Log stream client disconnected for job {job_id}")
-        finally:
-            with JOB_LOG_BROADCASTER_LOCK:
-                if job_id in JOB_LOG_BROADCASTER and listener_queue in JOB_LOG_BROADCASTER[job_id]:
-                    JOB_LOG_BROADCASTER[job_id].remove(listener_queue)
-    
-    def replay_log_events():
-        app.logger.info(f"Replaying log file for job {job_id}")
-        parser = LogParser()
-        try:
-            with open(log_path, 'r') as log_file:
-                for line in log_file:
-                    line_stripped = line.strip()
-                    if not line_stripped: continue
-                    if line_stripped.startswith("---") or \
-                       line_stripped.startswith("Command:") or \
-                       line_stripped.startswith("Project Dir:") or \
-                       line_stripped.startswith("PlatformIO Cache:") or \
-                       line_stripped.startswith("Env:"):
-                        continue
-                    for event in parser.parse_line(line_stripped):
-                        yield f"data: {json.dumps(event)}\n\n"
-            for event in parser.finalize():
-                yield f"data: {json.dumps(event)}\n\n"
-        except FileNotFoundError:
-            app.logger.error(f"Cannot replay log: File not found {log_path}")
-            yield f"data: {json.dumps({'event': 'milestone', 'milestone': 'Error: Log file not found', 'id': 'err'})}\n\n"
-        except Exception as e:
-            app.logger.error(f"Error replaying log {job_id}: {e}")
-            yield f"data: {json.dumps({'event': 'milestone', 'milestone': f'Error: {e}', 'id': 'err'})}\n\n"
-        finally:
-            yield f"data: {json.dumps({'event': 'CLOSE'})}\n\n"
-
-    if status == 'running' or status == 'pending':
-        return Response(subscribe_to_live_events(), mimetype='text/event-stream')
-    else:
-        return Response(replay_log_events(), mimetype='text/event-stream')
-
-
-@main_bp.route('/status/<job_id>', methods=['GET'])
-def get_job_status(job_id):
-    """Returns the JSON status for a single job."""
-    with JOBS_DB_LOCK:
-        job = JOBS_DB.get(job_id)
-    if not job: abort(404, "Job not found")
-    return jsonify(job.copy())
-
-@main_bp.route('/logs/<job_id>', methods=['GET'])
-def get_job_log(job_id):
-    """Returns the raw text log file for a job."""
-    with JOBS_DB_LOCK:
-        log_path = JOBS_DB.get(job_id, {}).get('log_file')
-    if not log_path: abort(404, "Job not found")
-    if not os.path.exists(log_path):
-        return "Log file not created yet. Job may be pending.", 200, {'Content-Type': 'text/plain'}
-    try:
-        return send_from_directory(os.path.dirname(log_path), os.path.basename(log_path), mimetype='text/plain')
-    except Exception as e:
-        app.logger.error(f"Could not send log file {log_path}: {e}")
-        return "Error reading log file.", 500, {'Content-Type': 'text/plain'}
-
-@main_bp.route('/download/<job_id>', methods=['GET'])
-def download_binary(job_id):
-    """Lets the user download the compiled binary if the job succeeded."""
-    with JOBS_DB_LOCK:
-        job = JOBS_DB.get(job_id)
-    
-    if not job: abort(404, "Job not found")
-    if job['status'] != 'success': abort(400, f"Job status is '{job['status']}', not 'success'. Binary not available.")
-    binary_file = job.get('binary_file')
-    if not binary_file: abort(404, "Job succeeded, but binary file reference is missing.")
-         
-    binary_path = os.path.join(config.BINARIES_DIR, binary_file)
-    if not os.path.exists(binary_path):
-        app.logger.error(f"Job {job_id} succeeded but binary file is missing from disk: {binary_path}")
-        abort(500, "Binary file not found on server, may have been cleaned up.")
-        
-    try:
-        return send_from_directory(
-            config.BINARIES_DIR,
-            binary_file,
-            as_attachment=True,
-            download_name=binary_file.split('-', 1)[-1] 
-        )
-    except Exception as e:
-        app.logger.error(f"Could not send binary file {binary_path}: {e}")
-        abort(500, "Error sending binary file.")
+        """
 
-@main_bp.route('/', methods=['GET'])
-def index():
-    """Simple index page with instructions."""
-    template = """
+_INDEX_TPL = """
         <html>
             <head><title>ESPHome Compile Server</title></head>
             <body style="font-family: sans-serif; padding: 2em; line-height: 1.6;">
@@ -596,6 +762,7 @@ def index():
                 <ul>
                     <li><code>POST /compile</code>: Upload files (device YAML + secrets) to start a new compile-only job.</li>
                     <li><code>GET /jobs</code>: View the HTML dashboard of all jobs.</li>
+                    <li><code>GET /jobs/stream</code>: Server-Sent Events with dashboard rows as jobs change.</li>
                     <li><code>GET /job/&lt;job_id&gt;</code>: View the live log for any job.</li>
                     <li><code>GET /job/&lt;job_id&gt;/upload</code>: Page to start an OTA upload for a successful compile job.</li>
                     <li><code>GET /status/&lt;job_id&gt;</code>: Get JSON status for a job.</li>
@@ -611,9 +778,11 @@ def index():
             </body>
         </html>
     """
-    return render_template_string(
-        template,
-        max_jobs=config.MAX_CONCURRENT_JOBS,
-        port=config.PORT
-    )
 
+_TEMPLATES = {
+    'dashboard': _DASHBOARD_TPL,
+    'dashboard_row': _DASHBOARD_ROW_TPL,
+    'upload': _UPLOAD_TPL,
+    'live': _LIVE_TPL,
+    'index': _INDEX_TPL,
+}
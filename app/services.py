@@ -6,72 +6,119 @@ Stateless services and helper functions.
 
 import re
 import os
-import uuid
+import itertools
+import secrets
 import logging
-from flask import current_app as app # Keep for routes, but avoid in services
 
 # --- Log Parsing ---
-progress_bar_regex = re.compile(r"^(RAM|Flash):\s*(\[.*?\])\s*(\d+\.\d+%)")
-download_bar_regex = re.compile(r"\[\?25l(Downloading|Unpacking)\s*(\[.*?\])\s*(\d+%)")
+# Random per-process prefix so ids from different workers never collide
+_STEP_ID_PREFIX = secrets.token_hex(4)
+_step_counter = itertools.count()
 
+def _reset_step_ids():
+    """Gives a forked worker (e.g. a Celery prefork child) its own id prefix."""
+    global _STEP_ID_PREFIX, _step_counter
+    _STEP_ID_PREFIX = secrets.token_hex(4)
+    _step_counter = itertools.count()
+
+os.register_at_fork(after_in_child=_reset_step_ids)
+
+def _new_step_id():
+    """Returns a unique DOM id for a log step: process prefix + counter, no uuid4 syscall."""
+    return f"step-{_STEP_ID_PREFIX}{next(_step_counter):x}"
+
+# Bars are a single bracketed run, so `[^\]]*` stops at the first ']' instead of
+# re-expanding a lazy `.*?` when the percentage that follows does not match.
+# Build output is ASCII: re.ASCII keeps \s on the plain ASCII class, and digits are [0-9]
+progress_bar_regex = re.compile(r"^(RAM|Flash):\s*(\[[^\]]*\])\s*([0-9]+\.[0-9]+%)", re.ASCII)
+download_bar_regex = re.compile(r"\[\?25l(Downloading|Unpacking)\s*(\[[^\]]*\])\s*([0-9]+%)", re.ASCII)
+_PROGRESS_BAR_FIRST = ('R', 'F')
+# PlatformIO package manager lines, checked with one startswith(tuple) call
+_INSTALLING_PREFIXES = ("Platform Manager: Installing", "Tool Manager: Installing", "Library Manager: Installing")
+# Results with no per-line data, returned as shared tuples
+_LOG_RESULT = ('log', None)
+_COMPILE_RESULT = ('compile_archive_line', None)
+
+# The milestone checks below are kept as plain substring tests on purpose:
+# a one-pass multi-pattern prefilter (pyahocorasick, hyperscan or a single
+# `re` alternation) costs more per line in CPython than this whole chain does
+# for the common "Compiling ..." line, which none of the tests match.
 def _parse_log_line_type(line):
-    """Parses a log line to find key milestones for the accordion UI."""
+    """
+    Parses a log line to find key milestones for the accordion UI.
+    Returns a (type, data) tuple; constant results are shared, not rebuilt per line.
+    """
+    # In the paired tests the rarer literal goes first so common lines (which
+    # often mention "error"/"ERROR") stop after one scan.
     if "Successfully uploaded" in line or line.startswith("===== [SUCCESS]"):
-        return {'type': 'milestone', 'data': 'Upload Succeeded'}
+        return ('milestone', 'Upload Succeeded')
     if "[SUCCESS]" in line and "Successfully created" in line:
-        return {'type': 'milestone', 'data': 'Build Succeeded'}
-    if "[FAILED]" in line or ("error" in line and "compilation terminated" in line) or line.startswith("===== [FAILED]"):
-        return {'type': 'milestone', 'data': 'Build Failed'}
-    if "ERROR" in line and "Authentication invalid" in line:
-        return {'type': 'milestone', 'data': 'Upload Failed: Authentication Invalid'}
-    if "Error:" in line and "Could not find" in line and ".local" in line:
-         return {'type': 'milestone', 'data': f'Upload Failed: Host not found'}
+        return ('milestone', 'Build Succeeded')
+    if "[FAILED]" in line or ("compilation terminated" in line and "error" in line) or line.startswith("===== [FAILED]"):
+        return ('milestone', 'Build Failed')
+    if "Authentication invalid" in line and "ERROR" in line:
+        return ('milestone', 'Upload Failed: Authentication Invalid')
+    if "Could not find" in line and "Error:" in line and ".local" in line:
+         return ('milestone', f'Upload Failed: Host not found')
     if "ERROR" in line and "Connecting to" in line:
-         return {'type': 'milestone', 'data': f'Upload Failed: {line.strip()}'}
+         return ('milestone', f'Upload Failed: {line.strip()}')
     if line.startswith("Error:"):
-        return {'type': 'milestone', 'data': f'Error: {line[6:].strip()}'}
+        return ('milestone', f'Error: {line[6:].strip()}')
 
-    progress_match = progress_bar_regex.match(line)
-    if progress_match:
-        return {'type': 'progress_bar', 'data': {'name': progress_match.group(1), 'bar': progress_match.group(2), 'percent': progress_match.group(3)}}
-    
-    download_match = download_bar_regex.match(line)
-    if download_match:
-        return {'type': 'progress_bar', 'data': {'name': download_match.group(1), 'bar': download_match.group(2), 'percent': download_match.group(3)}}
+    # Both bar regexes are anchored, so only lines opening with 'R'/'F' or '['
+    # can match; checking the first character keeps the rest out of `re`.
+    first = line[:1]
+    if first in _PROGRESS_BAR_FIRST:
+        progress_match = progress_bar_regex.match(line)
+        if progress_match:
+            return ('progress_bar', {'name': progress_match.group(1), 'bar': progress_match.group(2), 'percent': progress_match.group(3)})
+    elif first == '[':
+        download_match = download_bar_regex.match(line)
+        if download_match:
+            return ('progress_bar', {'name': download_match.group(1), 'bar': download_match.group(2), 'percent': download_match.group(3)})
 
     if "Looking for upload port..." in line:
-        return {'type': 'milestone', 'data': 'Finding Device...'}
+        return ('milestone', 'Finding Device...')
     if "Uploading" in line and ".bin" in line:
-        return {'type': 'milestone', 'data': 'Uploading Firmware'}
+        return ('milestone', 'Uploading Firmware')
     if "Connecting to" in line:
-        return {'type': 'milestone', 'data': line.strip()} 
+        return ('milestone', line.strip())
     if "merging binaries into" in line or "esp32_copy_ota_bin" in line or ("Successfully created" in line and ".bin" in line):
-        return {'type': 'milestone', 'data': 'Creating Final Binaries'}
+        return ('milestone', 'Creating Final Binaries')
     if line.startswith("RAM:"): 
-        return {'type': 'milestone', 'data': 'Calculating Firmware Size'}
+        return ('milestone', 'Calculating Firmware Size')
     if "Linking .pioenvs" in line and "firmware.elf" in line:
-        return {'type': 'milestone', 'data': 'Linking Firmware'}
+        return ('milestone', 'Linking Firmware')
     if "Linking .pioenvs" in line and "bootloader.elf" in line:
-        return {'type': 'milestone', 'data': 'Linking Bootloader'}
+        return ('milestone', 'Linking Bootloader')
     if "Generating project linker script" in line:
-        return {'type': 'milestone', 'data': 'Generating Linker Script'}
+        return ('milestone', 'Generating Linker Script')
     if "Compiling .pioenvs" in line or "Archiving .pioenvs" in line:
-        return {'type': 'compile_archive_line'}
+        return _COMPILE_RESULT
     if "scons:" in line or "Platformio:" in line or "NOTICE:" in line or "Resolving" in line or \
-       line.startswith("Platform Manager: Installing") or line.startswith("Tool Manager: Installing") or \
-       line.startswith("Library Manager: Installing"):
-        return {'type': 'milestone', 'data': 'Installing Dependencies'}
+       line.startswith(_INSTALLING_PREFIXES):
+        return ('milestone', 'Installing Dependencies')
     if "Generating C++ code" in line:
-        return {'type': 'milestone', 'data': 'Generating C++'}
+        return ('milestone', 'Generating C++')
     if "Running: platformio" in line or "Initializing Platformio" in line:
-        return {'type': 'milestone', 'data': 'Initializing PlatformIO'}
+        return ('milestone', 'Initializing PlatformIO')
     if "Validating" in line:
-        return {'type': 'milestone', 'data': 'Validating Config'}
-    return {'type': 'log'} 
+        return ('milestone', 'Validating Config')
+    return _LOG_RESULT
 
 
 class LogParser:
     """Holds the state for the accordion log parser."""
+    __slots__ = ('current_milestone', 'in_compile_step', 'compile_count', 'summary_id', 'milestone_id')
+    # Rule tables shared by every instance; only the parse state is per job
+    SILENT_MILESTONES = frozenset(["Upload Succeeded", "Build Succeeded", "Upload Failed: Authentication Invalid"])
+    PROGRESS_MILESTONES = {
+        'RAM': 'Calculating Firmware Size',
+        'Flash': 'Calculating Firmware Size',
+        'Downloading': 'Installing Dependencies',
+        'Unpacking': 'Installing Dependencies',
+    }
+
     def __init__(self):
         self.current_milestone = "Starting..."
         self.in_compile_step = False
@@ -81,7 +128,7 @@ class LogParser:
     
     def _start_milestone(self, name, line=None):
         self.current_milestone = name
-        self.milestone_id = f"step-{uuid.uuid4().hex}"
+        self.milestone_id = _new_step_id()
         event = {'event': 'milestone', 'milestone': name, 'id': self.milestone_id}
         if line: event['line'] = line
         return [event]
@@ -98,8 +145,7 @@ class LogParser:
 
     def parse_line(self, line):
         events = []
-        parse_result = _parse_log_line_type(line)
-        line_type = parse_result['type']
+        line_type, data = _parse_log_line_type(line)
         payload = {'event': 'log', 'line': line}
 
         if line_type == 'compile_archive_line':
@@ -108,27 +154,25 @@ class LogParser:
                 self.in_compile_step = True
                 self.compile_count = 1
                 self.current_milestone = "Compiling C/C++ Sources & Archiving"
-                self.summary_id = f"step-{uuid.uuid4().hex}"
+                self.summary_id = _new_step_id()
                 payload['event'] = 'milestone'
                 payload['milestone'] = self.current_milestone
                 payload['id'] = self.summary_id
             else:
                 self.compile_count += 1
                 if self.compile_count % 25 == 0:
-                    events.append({'event': 'update_summary', 'target_id': self.summary_id, 'text': f"Compiling C/C++ Sources & Archiving ({self.compile_count} files...)"})
+                    # Running count only; the page renders the "(N files...)" text
+                    events.append({'event': 'update_summary', 'target_id': self.summary_id, 'count': self.compile_count})
             events.append(payload)
         elif line_type == 'milestone':
-            milestone_text = parse_result['data']
+            milestone_text = data
             if self.current_milestone != milestone_text:
                 events.extend(self._close_compile_step())
                 events.extend(self._start_milestone(milestone_text))
-            if milestone_text not in ["Upload Succeeded", "Build Succeeded", "Upload Failed: Authentication Invalid"]:
+            if milestone_text not in self.SILENT_MILESTONES:
                 events.append({'event': 'log', 'line': line})
         elif line_type == 'progress_bar':
-            data = parse_result['data']
-            milestone_text = self.current_milestone
-            if data['name'] in ['RAM', 'Flash']: milestone_text = 'Calculating Firmware Size'
-            elif data['name'] in ['Downloading', 'Unpacking']: milestone_text = 'Installing Dependencies'
+            milestone_text = self.PROGRESS_MILESTONES.get(data['name'], self.current_milestone)
             if self.current_milestone != milestone_text:
                 events.extend(self._close_compile_step())
                 events.extend(self._start_milestone(milestone_text))
@@ -144,21 +188,41 @@ class LogParser:
 
 # --- File Helpers ---
 
+# A 'name:' key at any indentation; keys like 'friendly_name:' and commented lines don't match
+_NAME_RE = re.compile(rb'(?m)^[ \t]*name:[ \t]*["\']?([^"\'\s#]+)')
+# The esphome: block sits at the top of a config, so only this much is read first
+DEVICE_NAME_SCAN_BYTES = 8192
+
+def _match_device_name(data):
+    """Returns the first usable 'name:' value in a chunk of YAML bytes, skipping !secret/!lambda tags."""
+    for match in _NAME_RE.finditer(data):
+        name = match.group(1)
+        if not name.startswith(b'!'):
+            return name.decode('utf-8', 'replace')
+    return None
+
 def get_device_name_from_yaml(yaml_path):
-    """Quickly parses the YAML file to find the 'name:' field under 'esphome:'."""
+    """Quickly scans the YAML file to find the 'name:' field under 'esphome:'."""
     try:
-        with open(yaml_path, 'r') as f:
-            for line in f:
-                if 'name:' in line and not line.strip().startswith('#'):
-                    parts = line.split('name:')
-                    if len(parts) > 1:
-                        device_name = parts[1].strip().strip('"').strip("'")
-                        if device_name and not device_name.startswith('!'):
-                            return device_name
+        with open(yaml_path, 'rb') as f:
+            head = f.read(DEVICE_NAME_SCAN_BYTES)
+            if len(head) < DEVICE_NAME_SCAN_BYTES:
+                return _match_device_name(head)
+            # Only trust whole lines from the head; scan the rest if nothing matched
+            name = _match_device_name(head[:head.rfind(b'\n') + 1])
+            return name if name is not None else _match_device_name(head + f.read())
     except Exception as e:
         logging.warning(f"Could not parse device name from YAML: {e}. Falling back to filename.")
     return None # Return None on failure
 
+# Where PlatformIO leaves the image inside an ESPHome build dir, checked before walking it
+_FIRMWARE_CANDIDATES = (
+    os.path.join(".pioenvs", "{device}", "firmware.bin"),
+    os.path.join("build", "{device}", "firmware.bin"),
+)
+# Dependency/cache trees hold thousands of files and never the firmware image
+_FIRMWARE_WALK_SKIP = frozenset(("deps", "cache", ".piolibdeps", "src"))
+
 def _find_firmware_bin(project_dir, device_name):
     """
     Searches the project build directory for the compiled firmware.bin.
@@ -166,11 +230,17 @@ def _find_firmware_bin(project_dir, device_name):
     """
     build_dir = os.path.join(project_dir, ".esphome", "build", device_name)
     logging.info(f"Searching for binary in: {build_dir}")
+    for candidate in _FIRMWARE_CANDIDATES:
+        found_path = os.path.join(build_dir, candidate.format(device=device_name))
+        if os.path.isfile(found_path):
+            logging.info(f"Found binary at: {found_path}")
+            return found_path
     if os.path.isdir(build_dir):
         for root, dirs, files in os.walk(build_dir):
             if "firmware.bin" in files:
                 found_path = os.path.join(root, "firmware.bin")
                 logging.info(f"Found binary at: {found_path}")
                 return found_path
+            dirs[:] = [d for d in dirs if d not in _FIRMWARE_WALK_SKIP]
     return None
 
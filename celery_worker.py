@@ -11,8 +11,7 @@ Or via Celery CLI:
     celery -A celery_worker.celery worker --loglevel=info
 """
 
-from app.celery_app import celery
-import app.jobs  # Import module to register tasks
+from app.celery_app import celery  # Task modules are listed in the app's 'include'
 
 if __name__ == '__main__':
     celery.start()
@@ -5,8 +5,33 @@ This gets called before compilation to wrap the toolchain compilers with ccache.
 """
 
 import os
+import re
 import sys
 
+# Sidecar recording the (mtime, size) of a platformio.ini we already patched
+STAMP_SUFFIX = '.ccache_injected'
+
+# First section header starting with '[env' ([env] or [env:NAME]), whole line
+ENV_SECTION_RE = re.compile(r'^[ \t]*\[env.*$', re.M)
+
+def _ini_stamp(path):
+    """Identifies the current version of a file by mtime and size."""
+    st = os.stat(path)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+def _read_stamp(stamp_path):
+    """Returns the stamp left by a previous run, or None."""
+    try:
+        with open(stamp_path, 'r') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _write_stamp(platformio_ini):
+    """Records the patched file's current stamp next to it."""
+    with open(platformio_ini + STAMP_SUFFIX, 'w') as f:
+        f.write(_ini_stamp(platformio_ini))
+
 def inject_ccache_into_platformio_ini(project_dir):
     """
     Modifies the platformio.ini file in the project directory to use ccache.
@@ -17,12 +42,18 @@ def inject_ccache_into_platformio_ini(project_dir):
         print(f"platformio.ini not found at {platformio_ini}")
         return False
     
+    # Unchanged since we last patched it: skip reading and rewriting it
+    if _read_stamp(platformio_ini + STAMP_SUFFIX) == _ini_stamp(platformio_ini):
+        print("platformio.ini already has ccache configuration")
+        return True
+    
     with open(platformio_ini, 'r') as f:
         content = f.read()
     
     # Check if ccache is already configured
     if 'build_unflags' in content and '-fno-' in content:
         print("platformio.ini already has ccache configuration")
+        _write_stamp(platformio_ini)
         return True
     
     # Inject ccache configuration into the [env] section
@@ -40,24 +71,19 @@ extra_scripts =
     pre:inject_ccache_wrapper.py
 """
     
-    # Find the [env] or [env:NAME] section
-    lines = content.split('\n')
-    env_section_idx = -1
-    
-    for i, line in enumerate(lines):
-        if line.strip().startswith('[env'):
-            env_section_idx = i
-            break
-    
-    if env_section_idx == -1:
+    # Find the [env] or [env:NAME] section header
+    env_match = ENV_SECTION_RE.search(content)
+    if env_match is None:
         print("Could not find [env] section in platformio.ini")
         return False
     
     # Insert after the [env] line
-    lines.insert(env_section_idx + 1, ccache_config)
+    end = env_match.end()
+    content = content[:end] + '\n' + ccache_config + content[end:]
     
     with open(platformio_ini, 'w') as f:
-        f.write('\n'.join(lines))
+        f.write(content)
+    _write_stamp(platformio_ini)
     
     print(f"Successfully injected ccache config into {platformio_ini}")
     return True
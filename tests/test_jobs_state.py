@@ -0,0 +1,46 @@
+from app import jobs_state
+from app.jobs_state import CLOSE_FRAME, JobLogChannel
+
+
+def test_listen_sends_frames_published_while_consumer_is_suspended():
+    channel = JobLogChannel()
+    channel.publish({'event': 'log', 'line': 'first'})
+    stream = channel.listen(timeout=0.01)
+    assert next(stream) == b"event: log\ndata: first\n\n"
+
+    # The job finishes while the consumer is still suspended at the yield
+    channel.publish({'event': 'log', 'line': 'last'})
+    channel.publish({'event': 'CLOSE'})
+
+    rest = b"".join(stream)
+    assert b"data: last\n\n" in rest
+    assert rest.endswith(CLOSE_FRAME)
+
+
+def test_listen_on_closed_channel_replays_everything_then_stops():
+    channel = JobLogChannel()
+    channel.publish({'event': 'log', 'line': 'only'})
+    channel.publish({'event': 'CLOSE'})
+
+    assert list(channel.listen(timeout=0.01)) == [b"event: log\ndata: only\n\n" + CLOSE_FRAME]
+
+
+def test_replay_log_frames_follows_a_running_job(tmp_path, monkeypatch):
+    log_path = tmp_path / "job.log"
+    log_path.write_text("Validating\nCompiling .pioenvs/a.o")  # second line still being written
+    status = {'running': True}
+    monkeypatch.setattr(jobs_state, '_job_running', lambda job_id: status['running'])
+    monkeypatch.setattr(jobs_state, 'LOG_TAIL_INTERVAL', 0.01)
+
+    frames = jobs_state.replay_log_frames('job', str(log_path), follow=True)
+    first = next(frames)
+    assert b"Validating" in first and b"Compiling" not in first
+
+    with open(log_path, 'a') as log_file:
+        log_file.write("\n===== [SUCCESS] Took 1.00 seconds\n")
+    status['running'] = False
+
+    rest = b"".join(frames)
+    assert b"Compiling .pioenvs/a.o" in rest
+    assert b"Upload Succeeded" in rest
+    assert rest.endswith(CLOSE_FRAME)